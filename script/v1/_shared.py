@@ -0,0 +1,51 @@
+"""Helpers shared by the InfluxDB v1 scripts in this directory."""
+
+from influxdb import InfluxDBClient
+from urllib.parse import urlsplit
+import argparse
+import json
+import logging
+import sys
+
+try:
+    import orjson
+
+    def dump_json(data):
+        """Pretty-print a raw response for debug output."""
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def dump_json(data):
+        """Pretty-print a raw response for debug output."""
+        return json.dumps(data, indent=2)
+
+def positive_int(value: str):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def setup_logging(logger: logging.Logger, debug: bool = False):
+    """Print a script's log records, such as the --debug raw-response dumps, to stdout."""
+    # Only the script's logger gets the handler; library warnings (e.g. urllib3 retries) stay off stdout
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    logger.propagate = False
+
+def quote_ident(name: str):
+    """Quote an InfluxQL identifier, escaping embedded backslashes and double quotes."""
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def create_client(url: str, username: str, password: str):
+    """Create a single InfluxDB v1.x client shared by all queries of this run."""
+    parsed = urlsplit(url)
+    # IPv6 literals lose their brackets in .hostname; the client pastes the host straight into its base URL
+    host = f"[{parsed.hostname}]" if ":" in parsed.hostname else parsed.hostname
+    return InfluxDBClient(host=host,
+                          port=parsed.port or 8086,
+                          username=username or None,
+                          password=password or None,
+                          ssl=parsed.scheme == "https",
+                          gzip=True)
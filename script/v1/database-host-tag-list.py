@@ -1,17 +1,14 @@
 #!/bin/env python3
 
 from influxdb import InfluxDBClient
+from _shared import create_client, dump_json, quote_ident, setup_logging
 import argparse
-import json
+import logging
 
-def list_databases_and_measurements(url: str, username: str, password: str):
-    try:
-        # Initialize InfluxDB v1.x client
-        client = InfluxDBClient(host=url.split('://')[1].split(':')[0], 
-                               port=int(url.split(':')[-1]), 
-                               username=username or None, 
-                               password=password or None)
+logger = logging.getLogger(__name__)
 
+def list_databases_and_measurements(client: InfluxDBClient):
+    try:
         # Query all databases
         databases = client.query('SHOW DATABASES')
         db_list = [db['name'] for db in databases.get_points()]
@@ -21,10 +18,11 @@ def list_databases_and_measurements(url: str, username: str, password: str):
         for db in db_list:
             # Query retention policies
             try:
-                rp_query = client.query(f'SHOW RETENTION POLICIES ON "{db}"')
+                rp_query = client.query(f'SHOW RETENTION POLICIES ON {quote_ident(db)}')
                 retention_policies = list(rp_query.get_points())
                 # Log raw response for debugging
-                print(f"  Debug: Raw response for SHOW RETENTION POLICIES on database {db}: {json.dumps(retention_policies, indent=2)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"  Debug: Raw response for SHOW RETENTION POLICIES on database {db}: {dump_json(retention_policies)}")
             except Exception as e:
                 print(f"  Error querying retention policies for database {db}: {e}")
                 retention_policies = []
@@ -38,10 +36,11 @@ def list_databases_and_measurements(url: str, username: str, password: str):
 
             # Query measurements
             try:
-                measurements = client.query(f'SHOW MEASUREMENTS ON "{db}"')
+                measurements = client.query(f'SHOW MEASUREMENTS ON {quote_ident(db)}')
                 measurement_list = [m['name'] for m in measurements.get_points()]
                 # Log raw response for debugging
-                print(f"  Debug: Raw response for SHOW MEASUREMENTS on database {db}: {json.dumps(measurement_list, indent=2)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"  Debug: Raw response for SHOW MEASUREMENTS on database {db}: {dump_json(measurement_list)}")
                 print(f"  Measurements (Tables): {', '.join(measurement_list) if measurement_list else 'None'}")
                 if not measurement_list:
                     print(f"  Warning: No measurements found for database {db}. Check data presence or retention policies.")
@@ -52,34 +51,25 @@ def list_databases_and_measurements(url: str, username: str, password: str):
 
     except Exception as e:
         print(f"Error accessing InfluxDB: {e}")
-    finally:
-        client.close()
 
-def query_measurement(url: str, username: str, password: str, database: str, measurement: str = None):
+def query_measurement(client: InfluxDBClient, database: str, measurement: str = None):
+    # Query tag values using InfluxQL
+    tag_key = "host"
     try:
-        # Initialize client with specific database
-        client = InfluxDBClient(host=url.split('://')[1].split(':')[0], 
-                               port=int(url.split(':')[-1]), 
-                               username=username or None, 
-                               password=password or None, 
-                               database=database)
-
-        # Query tag values using InfluxQL
-        tag_key = "host"
         if measurement:
-            query = f'SHOW TAG VALUES ON "{database}" FROM "{measurement}" WITH KEY = "{tag_key}"'
+            query = f'SHOW TAG VALUES ON {quote_ident(database)} FROM {quote_ident(measurement)} WITH KEY = {quote_ident(tag_key)}'
             print(f"Querying tag '{tag_key}' values for measurement '{measurement}' in database '{database}'.")
         else:
-            query = f'SHOW TAG VALUES ON "{database}" WITH KEY = "{tag_key}"'
+            query = f'SHOW TAG VALUES ON {quote_ident(database)} WITH KEY = {quote_ident(tag_key)}'
             print(f"Querying tag '{tag_key}' values across all measurements in database '{database}'.")
 
-        result = client.query(query)
+        result = client.query(query, database=database)
         # Log raw response for debugging
-        raw_result = list(result.raw.get('series', []))
-        print(f"  Debug: Raw response for SHOW TAG VALUES: {json.dumps(raw_result, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            raw_result = list(result.raw.get('series', []))
+            logger.debug(f"  Debug: Raw response for SHOW TAG VALUES: {dump_json(raw_result)}")
 
-        tag_values = [point['value'] for point in result.get_points()]
-        tag_values = list(set(tag_values))  # Remove duplicates
+        tag_values = {point['value'] for point in result.get_points()}  # Remove duplicates
 
         print(f"\nTag: {tag_key}")
         print(f"List of '{tag_key}' tag values in database '{database}'{' for measurement ' + measurement if measurement else ' (all measurements)'}:")
@@ -92,20 +82,13 @@ def query_measurement(url: str, username: str, password: str, database: str, mea
 
     except Exception as e:
         print(f"Error querying '{tag_key}' tag values in database '{database}'{' for measurement ' + measurement if measurement else ''}: {e}")
-    finally:
-        client.close()
 
-def get_measurements(url: str, username: str, password: str, database: str):
+def get_measurements(client: InfluxDBClient, database: str):
     """Helper function to get all measurements in a database using InfluxQL."""
     try:
-        client = InfluxDBClient(host=url.split('://')[1].split(':')[0], 
-                               port=int(url.split(':')[-1]), 
-                               username=username or None, 
-                               password=password or None, 
-                               database=database)
-        measurements = client.query('SHOW MEASUREMENTS')
+        # Unchunked, so in-band errors such as "database not found" still raise
+        measurements = client.query('SHOW MEASUREMENTS', database=database)
         measurement_list = [m['name'] for m in measurements.get_points()]
-        client.close()
         return measurement_list
     except Exception as e:
         print(f"Error querying measurements for database {database}: {e}")
@@ -119,33 +102,35 @@ if __name__ == "__main__":
     parser.add_argument("--database", help="Database name to query (optional)")
     parser.add_argument("--measurement", help="Measurement to query for host tag values (optional)")
     parser.add_argument("--all-measurement", action="store_true", help="Query host tag values for all measurements in the database")
+    parser.add_argument("--debug", action="store_true", help="Print raw InfluxDB responses for debugging")
 
     args = parser.parse_args()
+    setup_logging(logger, args.debug)
 
-    # List databases and measurements
-    list_databases_and_measurements(url=args.url, username=args.username, password=args.password)
-
-    # Query host tag values
-    if args.database:
-        if args.all_measurement:
-            query_measurement(
-                url=args.url,
-                username=args.username,
-                password=args.password,
-                database=args.database,
-                measurement=None
-            )
-        elif args.measurement:
-            query_measurement(
-                url=args.url,
-                username=args.username,
-                password=args.password,
-                database=args.database,
-                measurement=args.measurement
-            )
+    client = create_client(url=args.url, username=args.username, password=args.password)
+    try:
+        # List databases and measurements
+        list_databases_and_measurements(client)
+
+        # Query host tag values
+        if args.database:
+            if args.all_measurement:
+                query_measurement(
+                    client,
+                    database=args.database,
+                    measurement=None
+                )
+            elif args.measurement:
+                query_measurement(
+                    client,
+                    database=args.database,
+                    measurement=args.measurement
+                )
+            else:
+                print("Error: Please specify --measurement or --all-measurement when providing --database.")
         else:
-            print("Error: Please specify --measurement or --all-measurement when providing --database.")
-    else:
-        if args.measurement or args.all_measurement:
-            print("Error: --database is required when using --measurement or --all-measurement.")
+            if args.measurement or args.all_measurement:
+                print("Error: --database is required when using --measurement or --all-measurement.")
+    finally:
+        client.close()
 
@@ -1,61 +1,81 @@
 #!/bin/env python3
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from datetime import datetime
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
 import os
 import csv
-import pytz
 from tzlocal import get_localzone
-
-def list_databases_and_measurements(url: str, username: str = None, password: str = None):
+from _shared import dump_json, positive_int, quote_ident, setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Resolved once; tzlocal re-reads the system zone configuration on every call
+UTC = timezone.utc
+LOCAL_TZ = get_localzone()
+
+# Catalog lookups memoized for the lifetime of the run: {(query, database): [names]}
+_meta_cache = {}
+
+def create_session(username: str = None, password: str = None, pool_size: int = 16):
+    """Create a requests session whose keep-alive connection pool and credentials are shared by all queries."""
+    session = requests.Session()
+    # Compressed responses on keep-alive connections
+    session.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
+    if username and password:
+        # HTTP basic auth keeps credentials out of the query string
+        session.auth = (username, password)
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          # Return the last response so raise_for_status reports it
+                          max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504), raise_on_status=False))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def list_databases_and_measurements(session: requests.Session, url: str):
     try:
         print(f"{'Database Name':<30} {'Measurements':<50}")
         print("-" * 80)
 
-        # Query all databases
-        query = "SHOW DATABASES"
-        params = {"q": query}
-        if username and password:
-            params["u"] = username
-            params["p"] = password
+        # Query all databases (served from the catalog cache if already known)
+        databases = _meta_cache.get(("SHOW DATABASES", None))
+        if databases is None:
+            query = "SHOW DATABASES"
+            params = {"q": query}
 
-        response = requests.get(f"{url}/query", params=params)
-        response.raise_for_status()
-        data = response.json()
+            response = session.get(f"{url}/query", params=params)
+            response.raise_for_status()
+            data = response.json()
 
-        print(f"  Debug: Raw response for SHOW DATABASES: {json.dumps(data, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"  Debug: Raw response for SHOW DATABASES: {dump_json(data)}")
 
-        databases = []
-        if "results" in data and data["results"] and "series" in data["results"][0] and "values" in data["results"][0]["series"][0]:
-            databases = [d[0] for d in data["results"][0]["series"][0]["values"]]
+            databases = []
+            if "results" in data and data["results"] and "series" in data["results"][0] and "values" in data["results"][0]["series"][0]:
+                databases = [d[0] for d in data["results"][0]["series"][0]["values"]]
+            _meta_cache[("SHOW DATABASES", None)] = databases
 
         for db in databases:
-            # Query measurements for each database
-            query = f"SHOW MEASUREMENTS"
-            params = {"q": query, "db": db}
-            if username and password:
-                params["u"] = username
-                params["p"] = password
-
             try:
-                response = requests.get(f"{url}/query", params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                print(f"  Debug: Raw response for SHOW MEASUREMENTS on database {db}: {json.dumps(data, indent=2)}")
-
-                measurements = []
-                if "results" in data and data["results"] and "series" in data["results"][0] and "values" in data["results"][0]["series"][0]:
-                    measurements = [m[0] for m in data["results"][0]["series"][0]["values"]]
+                # Query measurements for each database, remembering them for get_measurements
+                measurements = _meta_cache.get(("SHOW MEASUREMENTS", db))
+                if measurements is None:
+                    measurements = [m[0] for m in iter_chunked_values(session, url, "SHOW MEASUREMENTS", db)]
+                    _meta_cache[("SHOW MEASUREMENTS", db)] = measurements
                 print(f"{db:<30} {', '.join(measurements) if measurements else 'None':<50}")
                 if not measurements:
                     print(f"  Warning: No measurements found for database {db}. Check permissions or data presence.")
 
             except requests.exceptions.HTTPError as e:
                 print(f"  Error querying measurements for database {db}: HTTP {e.response.status_code} - {e.response.text}")
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, ValueError) as e:
                 print(f"  Error querying measurements for database {db}: {e}")
             except Exception as e:
                 print(f"  Unexpected error querying measurements for database {db}: {e}")
@@ -68,181 +88,154 @@ def list_databases_and_measurements(url: str, username: str = None, password: st
     except Exception as e:
         print(f"Unexpected error: {e}")
 
+@lru_cache(maxsize=4096)
+def parse_time(time_value):
+    """Parse an InfluxDB UTC timestamp into an aware datetime, raising ValueError when it is malformed."""
+    # Drop the trailing 'Z' and truncate nanoseconds to the microseconds datetime supports
+    base_time, _, fraction = time_value.rstrip('Z').partition('.')
+    return datetime.fromisoformat(f"{base_time}.{fraction[:6].ljust(6, '0')}" if fraction else base_time).replace(tzinfo=UTC)
+
+@lru_cache(maxsize=4096)
 def format_time(time_value):
     """Format time in both UTC and local timezone, handling nanosecond precision."""
-    # Remove nanoseconds by truncating to microseconds
-    if '.' in time_value:
-        base_time, fraction = time_value.split('.')
-        # Take first 6 digits of fractional part (microseconds)
-        fraction = fraction[:6] + 'Z'
-        time_value_truncated = f"{base_time}.{fraction}"
-
     try:
-        # Parse UTC time (microseconds)
-        utc_time = datetime.strptime(time_value_truncated, "%Y-%m-%dT%H:%M:%S.%fZ")
-        utc_time = utc_time.replace(tzinfo=pytz.UTC)
-        formatted_utc = utc_time.strftime("%Y-%m-%d %H:%M:%S.%f")
+        utc_time = parse_time(time_value)
     except ValueError:
-        try:
-            # Try without microseconds
-            utc_time = datetime.strptime(time_value, "%Y-%m-%dT%H:%M:%SZ")
-            utc_time = utc_time.replace(tzinfo=pytz.UTC)
-            formatted_utc = utc_time.strftime("%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            formatted_utc = time_value
-            utc_time = None
-
-    # Convert to local time
-    if utc_time:
-        local_tz = get_localzone()
-        local_time = utc_time.astimezone(local_tz)
-        formatted_local = local_time.strftime("%Y-%m-%d %H:%M:%S.%f" if formatted_utc.endswith(".%f") else "%Y-%m-%d %H:%M:%S")
-    else:
-        formatted_local = time_value
+        return time_value, time_value
 
-    return formatted_utc, formatted_local
+    # Keep microseconds only when InfluxDB returned a fractional part
+    time_format = "%Y-%m-%d %H:%M:%S.%f" if "." in time_value else "%Y-%m-%d %H:%M:%S"
+    return utc_time.strftime(time_format), utc_time.astimezone(LOCAL_TZ).strftime(time_format)
 
-def query_measurement(url: str, username: str, password: str, database: str, measurement: str = None, latest_time: bool = False, all_measurement: bool = False, output_dir: str = "output"):
+def query_measurement(session: requests.Session, executor: ThreadPoolExecutor, url: str, database: str, measurement: str = None, latest_time: bool = False, all_measurement: bool = False, output_dir: str = "output"):
     try:
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
         # Dictionary to track all host times across measurements
-        host_times = {}  # {host: [time1, time2, ...]}
+        host_times = {}  # {host: (oldest, newest)}, each a (utc_time, raw_time) pair
 
         # Get measurements to query
         if measurement:
             measurements = [measurement]
             print(f"\nQuerying {'latest record time' if latest_time else 'host tag values'} for measurement '{measurement}' in database '{database}'.")
         else:
-            measurements = get_measurements(url, username, password, database)
+            measurements = get_measurements(session, url, database)
             if not measurements:
                 print(f"\nNo measurements found in database '{database}'. Check permissions or data presence.")
                 return
             print(f"\nQuerying {'latest record time' if latest_time else 'host tag values'} for all measurements in database '{database}' ({len(measurements)} measurements found).")
 
+        # Without an explicit measurement, one SHOW TAG VALUES returns the hosts of every measurement
+        tag_key = "host"
+        hosts_by_measurement = None
+        if not measurement:
+            print(f"  Fetching all '{tag_key}' tag values across all measurements in database '{database}'.")
+            try:
+                hosts_by_measurement = get_host_tag_values(session, url, database, tag_key=tag_key)
+            except requests.exceptions.HTTPError as e:
+                print(f"  Error querying '{tag_key}' tag values in database '{database}': HTTP {e.response.status_code} - {e.response.text}")
+            except requests.exceptions.RequestException as e:
+                print(f"  Error querying '{tag_key}' tag values in database '{database}': {e}")
+
+        # Start the latest-time queries concurrently; results are consumed in order below
+        latest_futures = {}
+        if latest_time:
+            for meas in measurements:
+                if hosts_by_measurement is None or meas in hosts_by_measurement:
+                    latest_futures[meas] = executor.submit(get_latest_times, session, url, database, meas, tag_key)
+
         processed_count = 0
         for meas in measurements:
             processed_count += 1
             print(f"\nMeasurement: {meas} ({processed_count}/{len(measurements)})")
             print("=" * 80)
 
-            # Initialize CSV data for this measurement
-            csv_data = []
-
-            # Step 1: Get all host tag values for the measurement
-            tag_key = "host"
-            query = f'SHOW TAG VALUES FROM "{meas}" WITH KEY = "{tag_key}"'
-            print(f"  Fetching all '{tag_key}' tag values for measurement '{meas}'.")
-
             try:
-                params = {"q": query, "db": database}
-                if username and password:
-                    params["u"] = username
-                    params["p"] = password
-                response = requests.get(f"{url}/query", params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                print(f"    Debug: Raw response for SHOW TAG VALUES: {json.dumps(data, indent=2)}")
-
-                host_values = []
-                if "results" in data and data["results"] and "series" in data["results"][0]:
-                    for series in data["results"][0]["series"]:
-                        if "values" in series:
-                            host_values.extend(v[1] for v in series["values"])
-                    host_values = list(set(host_values))  # Remove duplicates
+                # Step 1: Get all host tag values for the measurement
+                if hosts_by_measurement is None:
+                    print(f"  Fetching all '{tag_key}' tag values for measurement '{meas}'.")
+                    host_values = get_host_tag_values(session, url, database, meas, tag_key).get(meas, set())
                 else:
-                    print(f"  No '{tag_key}' tag values found for measurement '{meas}' in database '{database}'.")
-                    continue
+                    host_values = hosts_by_measurement.get(meas, set())
 
                 if not host_values:
-                    print(f"  No '{tag_key}' tag values found for measurement '{meas}'.")
+                    print(f"  No '{tag_key}' tag values found for measurement '{meas}' in database '{database}'.")
                     continue
 
                 # Step 2: Process based on mode
                 if latest_time:
-                    # Query latest record for each host
+                    # Latest record for each host, from the GROUP BY query started above
                     print(f"  Latest record time for each host in measurement '{meas}' (database: {database}):")
                     print(f"  {'Host':<30} {'Time_UTC':<30} {'Time_Local':<30}")
                     print("  " + "-" * 90)
 
-                    for host in sorted(host_values):
-                        query = f'SELECT * FROM "{meas}" WHERE host=\'{host}\' LIMIT 1'
-                        try:
-                            params = {"q": query, "db": database}
-                            if username and password:
-                                params["u"] = username
-                                params["p"] = password
-                            response = requests.get(f"{url}/query", params=params)
-                            response.raise_for_status()
-                            data = response.json()
-
-                            print(f"    Debug: Raw response for SELECT * WHERE host='{host}': {json.dumps(data, indent=2)}")
-
-                            if "results" not in data or not data["results"] or "series" not in data["results"][0]:
-                                print(f"  No data found for host '{host}' in measurement '{meas}'.")
-                                continue
-
-                            series = data["results"][0]["series"][0]
-                            time_value = series["values"][0][0]  # Time is the first column
-
-                            # Store raw time for OldTime/NewTime calculation
-                            if host not in host_times:
-                                host_times[host] = []
-                            host_times[host].append(time_value)
-
-                            # Format time in UTC and local
-                            formatted_utc, formatted_local = format_time(time_value)
-
-                            print(f"  {host:<30} {formatted_utc:<30} {formatted_local:<30}")
-                            csv_data.append({"Host": host, "LastTime_UTC": formatted_utc, "LastTime_Local": formatted_local})
-
-                        except requests.exceptions.HTTPError as e:
-                            print(f"  Error querying host '{host}' in measurement '{meas}': HTTP {e.response.status_code} - {e.response.text}")
-                            continue
-                        except requests.exceptions.RequestException as e:
-                            print(f"  Error querying host '{host}' in measurement '{meas}': {e}")
-                            continue
-                        except Exception as e:
-                            print(f"  Unexpected error querying host '{host}' in measurement '{meas}': {e}")
-                            continue
+                    try:
+                        latest_times = latest_futures[meas].result()
+                    except requests.exceptions.HTTPError as e:
+                        print(f"  Error querying latest record times in measurement '{meas}': HTTP {e.response.status_code} - {e.response.text}")
+                        continue
+                    except requests.exceptions.RequestException as e:
+                        print(f"  Error querying latest record times in measurement '{meas}': {e}")
+                        continue
 
                     # Write CSV file for this measurement
-                    if csv_data:
-                        csv_file = os.path.join(output_dir, f"{database}_{meas}.csv")
-                        try:
-                            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                                writer = csv.DictWriter(f, fieldnames=["Host", "LastTime_UTC", "LastTime_Local"])
-                                writer.writeheader()
-                                writer.writerows(csv_data)
+                    csv_file = os.path.join(output_dir, f"{database}_{meas}.csv")
+                    rows_written = 0
+                    try:
+                        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+                            writer = csv.writer(f)
+                            writer.writerow(("Host", "LastTime_UTC", "LastTime_Local"))
+
+                            for host in sorted(host_values):
+                                time_value = latest_times.get(host)
+                                if time_value is None:
+                                    print(f"  No data found for host '{host}' in measurement '{meas}'.")
+                                    continue
+
+                                try:
+                                    # Format time in UTC and local
+                                    utc_time = parse_time(time_value)
+                                    formatted_utc, formatted_local = format_time(time_value)
+                                except ValueError:
+                                    print(f"  Invalid time format for host '{host}' in measurement '{meas}': {time_value}")
+                                    continue
+                                except Exception as e:
+                                    print(f"  Unexpected error formatting time for host '{host}' in measurement '{meas}': {e}")
+                                    continue
+
+                                # Track oldest/newest time for OldTime/NewTime
+                                entry = (utc_time, time_value)
+                                prev = host_times.get(host)
+                                host_times[host] = (min(prev[0], entry), max(prev[1], entry)) if prev else (entry, entry)
+
+                                print(f"  {host:<30} {formatted_utc:<30} {formatted_local:<30}")
+                                writer.writerow((host, formatted_utc, formatted_local))
+                                rows_written += 1
+
+                        if rows_written:
                             print(f"  Saved results to {csv_file}")
-                        except IOError as e:
-                            print(f"  Error writing CSV file '{csv_file}': {e}")
-                    else:
-                        print(f"  No data to save for measurement '{meas}'.")
+                        else:
+                            os.remove(csv_file)
+                            print(f"  No data to save for measurement '{meas}'.")
+                    except IOError as e:
+                        print(f"  Error writing CSV file '{csv_file}': {e}")
 
                 else:
-                    # Display host tag values
+                    # Display host tag values and write them to the CSV file (only Host column)
                     print(f"  List of '{tag_key}' tag values in measurement '{meas}' (database: {database}):")
                     print("  " + "-" * 60)
-                    for host in sorted(host_values):
-                        print(f"  {host}")
-                        csv_data.append({"Host": host, "LastTime_UTC": "", "LastTime_Local": ""})
-
-                    # Write CSV file for this measurement (only Host column)
-                    if csv_data:
-                        csv_file = os.path.join(output_dir, f"{database}_{meas}.csv")
-                        try:
-                            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                                writer = csv.DictWriter(f, fieldnames=["Host", "LastTime_UTC", "LastTime_Local"])
-                                writer.writeheader()
-                                writer.writerows(csv_data)
-                            print(f"  Saved results to {csv_file}")
-                        except IOError as e:
-                            print(f"  Error writing CSV file '{csv_file}': {e}")
-                    else:
-                        print(f"  No data to save for measurement '{meas}'.")
+                    csv_file = os.path.join(output_dir, f"{database}_{meas}.csv")
+                    try:
+                        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+                            writer = csv.writer(f)
+                            writer.writerow(("Host", "LastTime_UTC", "LastTime_Local"))
+                            for host in sorted(host_values):
+                                print(f"  {host}")
+                                writer.writerow((host, "", ""))
+                        print(f"  Saved results to {csv_file}")
+                    except IOError as e:
+                        print(f"  Error writing CSV file '{csv_file}': {e}")
 
             except requests.exceptions.HTTPError as e:
                 print(f"  Error querying '{tag_key}' tag values for measurement '{meas}' in database '{database}': HTTP {e.response.status_code} - {e.response.text}")
@@ -257,68 +250,32 @@ def query_measurement(url: str, username: str, password: str, database: str, mea
 
         # Generate all-result.csv and all-result.txt with Host, OldTime_UTC, OldTime_Local, NewTime_UTC, NewTime_Local
         if latest_time and host_times:
-            # Generate all-result.csv
             result_csv_file = os.path.join(output_dir, "all-result.csv")
-            try:
-                with open(result_csv_file, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=["Host", "OldTime_UTC", "OldTime_Local", "NewTime_UTC", "NewTime_Local"])
-                    writer.writeheader()
-
-                    # Process each host
-                    for host in sorted(host_times.keys()):
-                        times = host_times[host]
-                        if not times:
-                            continue
-
-                        # Find oldest and newest times
-                        oldest_time = min(times)
-                        newest_time = max(times)
-
-                        # Format times in UTC and local
-                        formatted_old_utc, formatted_old_local = format_time(oldest_time)
-                        formatted_new_utc, formatted_new_local = format_time(newest_time)
-
-                        # Write row
-                        writer.writerow({
-                            "Host": host,
-                            "OldTime_UTC": formatted_old_utc,
-                            "OldTime_Local": formatted_old_local,
-                            "NewTime_UTC": formatted_new_utc,
-                            "NewTime_Local": formatted_new_local
-                        })
-
-                print(f"\nSaved summary to {result_csv_file}")
-            except IOError as e:
-                print(f"Error writing summary file '{result_csv_file}': {e}")
-
-            # Generate all-result.txt
             result_txt_file = os.path.join(output_dir, "all-result.txt")
             try:
-                with open(result_txt_file, 'w', encoding='utf-8') as f:
-                    # Write header
-                    f.write(f"{'Host':<30} {'OldTime_UTC':<30} {'OldTime_Local':<30} {'NewTime_UTC':<30} {'NewTime_Local':<30}\n")
-                    f.write("-" * 150 + "\n")
+                # Write both summary files in one pass
+                with open(result_csv_file, 'w', newline='', encoding='utf-8') as fc, open(result_txt_file, 'w', encoding='utf-8') as ft:
+                    writer = csv.writer(fc)
+                    writer.writerow(("Host", "OldTime_UTC", "OldTime_Local", "NewTime_UTC", "NewTime_Local"))
+                    ft.write(f"{'Host':<30} {'OldTime_UTC':<30} {'OldTime_Local':<30} {'NewTime_UTC':<30} {'NewTime_Local':<30}\n")
+                    ft.write("-" * 150 + "\n")
 
                     # Process each host
                     for host in sorted(host_times.keys()):
-                        times = host_times[host]
-                        if not times:
-                            continue
-
-                        # Find oldest and newest times
-                        oldest_time = min(times)
-                        newest_time = max(times)
+                        oldest_time, newest_time = host_times[host]
 
                         # Format times in UTC and local
-                        formatted_old_utc, formatted_old_local = format_time(oldest_time)
-                        formatted_new_utc, formatted_new_local = format_time(newest_time)
+                        formatted_old_utc, formatted_old_local = format_time(oldest_time[1])
+                        formatted_new_utc, formatted_new_local = format_time(newest_time[1])
 
                         # Write row
-                        f.write(f"{host:<30} {formatted_old_utc:<30} {formatted_old_local:<30} {formatted_new_utc:<30} {formatted_new_local:<30}\n")
+                        writer.writerow((host, formatted_old_utc, formatted_old_local, formatted_new_utc, formatted_new_local))
+                        ft.write(f"{host:<30} {formatted_old_utc:<30} {formatted_old_local:<30} {formatted_new_utc:<30} {formatted_new_local:<30}\n")
 
+                print(f"\nSaved summary to {result_csv_file}")
                 print(f"Saved summary to {result_txt_file}")
             except IOError as e:
-                print(f"Error writing summary file '{result_txt_file}': {e}")
+                print(f"Error writing summary files '{result_csv_file}', '{result_txt_file}': {e}")
         elif latest_time:
             print("\nNo host times found to generate all-result.csv or all-result.txt.")
 
@@ -327,27 +284,87 @@ def query_measurement(url: str, username: str, password: str, database: str, mea
     except Exception as e:
         print(f"Unexpected error processing database '{database}': {e}")
 
-def get_measurements(url: str, username: str, password: str, database: str):
-    """Helper function to get all measurements in a database using InfluxQL."""
-    try:
-        query = f'SHOW MEASUREMENTS'
-        params = {"q": query, "db": database}
-        if username and password:
-            params["u"] = username
-            params["p"] = password
-        response = requests.get(f"{url}/query", params=params)
+def get_latest_times(session: requests.Session, url: str, database: str, measurement: str, tag_key: str = "host"):
+    """Helper function to get the latest record time of every host in a measurement with one GROUP BY query."""
+    # Only field columns are projected: tag columns are not needed to read the timestamp
+    query = f'SELECT *::field FROM {quote_ident(measurement)} GROUP BY {quote_ident(tag_key)} ORDER BY time DESC LIMIT 1'
+    params = {"q": query, "db": database}
+    response = session.get(f"{url}/query", params=params)
+    response.raise_for_status()
+    data = response.json()
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"    Debug: Raw response for SELECT *::field FROM {measurement} GROUP BY {tag_key}: {dump_json(data)}")
+
+    # Each series carries one host tag and its latest row; time is the first column
+    latest_times = {}
+    if "results" in data and data["results"] and "series" in data["results"][0]:
+        for series in data["results"][0]["series"]:
+            host = series.get("tags", {}).get(tag_key)
+            if host and series.get("values"):
+                latest_times[host] = series["values"][0][0]
+    return latest_times
+
+def iter_chunked_values(session: requests.Session, url: str, query: str, database: str, chunk_size: int = 10000):
+    """Helper function to stream the value rows of a chunked InfluxQL response as they arrive."""
+    params = {"q": query, "db": database, "chunked": "true", "chunk_size": chunk_size}
+    with session.get(f"{url}/query", params=params, stream=True) as response:
         response.raise_for_status()
-        data = response.json()
+        # Chunked responses are newline-delimited JSON documents, each holding part of the series
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"  Debug: Raw response chunk for {query} on database {database}: {dump_json(data)}")
+
+            # Failures such as "database not found" are reported in-band with HTTP 200
+            error = data.get("error") or (data.get("results") or [{}])[0].get("error")
+            if error:
+                raise ValueError(f"InfluxDB query failed: {error}")
+            if "results" in data and data["results"] and "series" in data["results"][0]:
+                for series in data["results"][0]["series"]:
+                    yield from series.get("values", [])
+
+def get_host_tag_values(session: requests.Session, url: str, database: str, measurement: str = None, tag_key: str = "host"):
+    """Helper function to get tag values grouped by measurement using a single SHOW TAG VALUES query."""
+    if measurement:
+        query = f'SHOW TAG VALUES FROM {quote_ident(measurement)} WITH KEY = {quote_ident(tag_key)}'
+    else:
+        query = f'SHOW TAG VALUES WITH KEY = {quote_ident(tag_key)}'
+    params = {"q": query, "db": database}
+    response = session.get(f"{url}/query", params=params)
+    response.raise_for_status()
+    data = response.json()
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"    Debug: Raw response for SHOW TAG VALUES: {dump_json(data)}")
+
+    # Each series is one measurement, with values of the form [[tag_key, tag_value], ...]; sets drop duplicates
+    tag_values = {}
+    if "results" in data and data["results"] and "series" in data["results"][0]:
+        for series in data["results"][0]["series"]:
+            if "values" in series:
+                tag_values.setdefault(series["name"], set()).update(v[1] for v in series["values"])
+    return tag_values
+
+def get_measurements(session: requests.Session, url: str, database: str):
+    """Helper function to get all measurements in a database using InfluxQL."""
+    cached = _meta_cache.get(("SHOW MEASUREMENTS", database))
+    if cached is not None:
+        return cached
 
-        measurements = []
-        if "results" in data and data["results"] and "series" in data["results"][0] and "values" in data["results"][0]["series"][0]:
-            measurements = [m[0] for m in data["results"][0]["series"][0]["values"]]
-        print(f"  Debug: Found measurements in database {database}: {', '.join(measurements) if measurements else 'None'}")
+    try:
+        measurements = [m[0] for m in iter_chunked_values(session, url, "SHOW MEASUREMENTS", database)]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"  Debug: Found measurements in database {database}: {', '.join(measurements) if measurements else 'None'}")
+        _meta_cache[("SHOW MEASUREMENTS", database)] = measurements
         return measurements
     except requests.exceptions.HTTPError as e:
         print(f"Error querying measurements for database {database}: HTTP {e.response.status_code} - {e.response.text}")
         return []
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error querying measurements for database {database}: {e}")
         return []
     except Exception as e:
@@ -364,27 +381,36 @@ if __name__ == "__main__":
     parser.add_argument("--all-measurement", action="store_true", help="Query host tag values or latest time for all measurements in the database")
     parser.add_argument("--latest-time", action="store_true", help="Query the latest record time for each host in the measurement(s)")
     parser.add_argument("--output-dir", default="output", help="Directory to save CSV and summary output files (default: output)")
+    parser.add_argument("--workers", type=positive_int, default=16, help="Number of concurrent queries sent to InfluxDB (default: 16)")
+    parser.add_argument("--debug", action="store_true", help="Print raw InfluxDB responses for debugging")
 
     args = parser.parse_args()
+    setup_logging(logger, args.debug)
 
-    # List databases and measurements
-    list_databases_and_measurements(url=args.url, username=args.username, password=args.password)
-
-    # Query host tag values or latest time
-    if args.database:
-        if args.latest_time or args.all_measurement or args.measurement:
-            query_measurement(
-                url=args.url,
-                username=args.username,
-                password=args.password,
-                database=args.database,
-                measurement=args.measurement,
-                latest_time=args.latest_time,
-                all_measurement=args.all_measurement,
-                output_dir=args.output_dir
-            )
+    session = create_session(username=args.username, password=args.password, pool_size=args.workers)
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        # List databases and measurements
+        list_databases_and_measurements(session, url=args.url)
+
+        # Query host tag values or latest time
+        if args.database:
+            if args.latest_time or args.all_measurement or args.measurement:
+                query_measurement(
+                    session,
+                    executor,
+                    url=args.url,
+                    database=args.database,
+                    measurement=args.measurement,
+                    latest_time=args.latest_time,
+                    all_measurement=args.all_measurement,
+                    output_dir=args.output_dir
+                )
+            else:
+                print("Error: Please specify --measurement, --all-measurement, or --latest-time when providing --database.")
         else:
-            print("Error: Please specify --measurement, --all-measurement, or --latest-time when providing --database.")
-    else:
-        print("Error: --database is required when using --measurement, --all-measurement, or --latest-time.")
+            print("Error: --database is required when using --measurement, --all-measurement, or --latest-time.")
+    finally:
+        executor.shutdown()
+        session.close()
 
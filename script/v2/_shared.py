@@ -0,0 +1,167 @@
+"""Helpers shared by the InfluxDB v2 scripts in this directory."""
+
+from influxdb_client import InfluxDBClient
+from influxdb_client.client.exceptions import InfluxDBError
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import functools
+import io
+import json
+import csv
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+# orjson decodes large InfluxQL responses several times faster; fall back to the stdlib when it is missing
+try:
+    import orjson
+
+    def load_json(content: bytes):
+        """Decode a raw response body."""
+        return orjson.loads(content)
+
+    def dump_json(data):
+        """Pretty-print a raw response for debug output."""
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def load_json(content: bytes):
+        """Decode a raw response body."""
+        return json.loads(content)
+
+    def dump_json(data):
+        """Pretty-print a raw response for debug output."""
+        return json.dumps(data, indent=2)
+
+def positive_int(value: str):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def setup_logging(script_logger: logging.Logger, debug: bool = False):
+    """Print the log records of a script and of these helpers, such as the --debug raw-response dumps, to stdout."""
+    # Only these loggers get the handler; library warnings (e.g. urllib3 retries) stay off stdout
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for log in (script_logger, logger):
+        log.addHandler(handler)
+        log.setLevel(logging.DEBUG if debug else logging.INFO)
+        log.propagate = False
+
+def create_session(token: str, pool_size: int = 16):
+    """Create a requests session whose keep-alive connection pool and token are shared by all queries."""
+    session = requests.Session()
+    # Ask for compressed responses on persistent connections; requests decompresses transparently
+    session.headers.update({"Authorization": f"Token {token}", "Accept-Encoding": "gzip", "Connection": "keep-alive"})
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          # Every v2 query is a read-only POST, which urllib3 does not retry unless told to; after the last
+                          # retry the response is returned so raise_for_status reports the HTTP error as usual
+                          max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                                            allowed_methods=frozenset({"POST"}), raise_on_status=False))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def post_query(session: requests.Session, url: str, org: str, bucket: str, query: str):
+    """Helper function to run an InfluxQL query through the v2 /query compatibility endpoint and return the decoded JSON."""
+    response = session.post(f"{url}/query", params={"org": org, "db": bucket, "q": query})
+    response.raise_for_status()
+    return load_json(response.content)
+
+def quote_ident(name: str):
+    """Quote an InfluxQL identifier, escaping embedded backslashes and double quotes."""
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def quote_flux_string(value: str):
+    """Quote a Flux string literal, escaping embedded backslashes, double quotes and ${ interpolations."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('${', '\\${') + '"'
+
+def flux_error_message(header: list, rows):
+    """Helper function to read the message of an in-band Flux "error,reference" table from the row after its header."""
+    error_row = next(rows, [])
+    index = header.index("error") if "error" in header else -1
+    return error_row[index] if 0 <= index < len(error_row) else ",".join(error_row)
+
+def iter_flux_values(session: requests.Session, url: str, org: str, query: str):
+    """Helper function to run a Flux query and stream the _value column of its CSV response row by row."""
+    headers = {"Content-Type": "application/vnd.flux", "Accept": "application/csv"}
+    with session.post(f"{url}/api/v2/query", params={"org": org}, data=query.encode("utf-8"), headers=headers, stream=True) as response:
+        response.raise_for_status()
+        # Read the decompressed body with its line endings intact; iter_lines can yield a spurious empty line when a
+        # chunk ends between "\r" and "\n", which would look like a table boundary
+        # auto_close stays off so the wrapper sees a clean EOF instead of a closed file
+        response.raw.decode_content = True
+        response.raw.auto_close = False
+        rows = csv.reader(io.TextIOWrapper(response.raw, encoding="utf-8", newline=""))
+        value_index = None
+        for row in rows:
+            if not row or row[0].startswith("#"):
+                # A blank line ends a table and annotation rows precede one; a header row follows either way
+                value_index = None
+            elif value_index is None:
+                if "_value" not in row:
+                    # Flux reports query failures in-band as an "error,reference" table
+                    raise ValueError(f"Flux query failed: {flux_error_message(row, rows)}")
+                value_index = row.index("_value")
+            else:
+                yield row[value_index]
+
+# Memoized for the lifetime of the run, so a bucket listed up front is not queried again for --bucket;
+# failed queries raise and are therefore never cached
+@functools.lru_cache(maxsize=256)
+def query_measurement_names(session: requests.Session, url: str, org: str, bucket: str):
+    """Helper function to list the measurements of a bucket with Flux (over all time, like SHOW MEASUREMENTS)."""
+    query = f'import "influxdata/influxdb/schema"\nschema.measurements(bucket: {quote_flux_string(bucket)}, start: 0)'
+    return tuple(iter_flux_values(session, url, org, query))
+
+def get_tag_values(session: requests.Session, url: str, org: str, bucket: str, measurement: str = None, tag_key: str = "host"):
+    """Helper function to get the distinct values of a tag, in one measurement or the whole bucket, with Flux (over all time, like SHOW TAG VALUES)."""
+    if measurement:
+        call = (f'schema.measurementTagValues(bucket: {quote_flux_string(bucket)}, measurement: {quote_flux_string(measurement)}, '
+                f'tag: {quote_flux_string(tag_key)}, start: 0)')
+    else:
+        call = f'schema.tagValues(bucket: {quote_flux_string(bucket)}, tag: {quote_flux_string(tag_key)}, start: 0)'
+    return set(iter_flux_values(session, url, org, f'import "influxdata/influxdb/schema"\n{call}'))
+
+def list_buckets_and_measurements(client: InfluxDBClient, session: requests.Session, executor: ThreadPoolExecutor, url: str, org: str):
+    """Print every bucket with its retention and measurements, querying the measurements of all buckets concurrently."""
+    try:
+        buckets_api = client.buckets_api()
+
+        buckets = buckets_api.find_buckets()
+        print(f"{'Bucket Name':<30} {'Bucket ID':<40} {'Retention':<15}")
+        print("-" * 85)
+        # Issue the per-bucket measurement queries on the shared executor; results are printed in bucket order
+        futures = [executor.submit(query_measurement_names, session, url, org, b.name) for b in buckets.buckets]
+        for b, future in zip(buckets.buckets, futures):
+            retention = b.retention_rules[0].every_seconds if b.retention_rules else "infinite"
+            print(f"{b.name:<30} {b.id:<40} {retention:<15}")
+
+            try:
+                measurements = future.result()
+
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"  Debug: Measurements returned by schema.measurements on bucket {b.name}: {dump_json(measurements)}")
+
+                print(f"  Measurements (Tables): {', '.join(measurements) if measurements else 'None'}")
+                if not measurements:
+                    print(f"  Warning: No measurements found for bucket {b.name}. Check token permissions or data presence.")
+
+            except requests.exceptions.HTTPError as e:
+                print(f"  Error querying measurements for bucket {b.name}: HTTP {e.response.status_code} - {e.response.text}")
+            except requests.exceptions.RequestException as e:
+                print(f"  Error querying measurements for bucket {b.name}: {e}")
+            except Exception as e:
+                print(f"  Unexpected error querying measurements for bucket {b.name}: {e}")
+            print()
+
+    except InfluxDBError as e:
+        print(f"Error accessing InfluxDB: {e}")
+    except Exception as e:
+        print(f"Unexpected error: {e}")
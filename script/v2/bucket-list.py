@@ -3,8 +3,7 @@
 from influxdb_client import InfluxDBClient
 import argparse
 
-def list_buckets(url: str, token: str, org: str):
-    client = InfluxDBClient(url=url, token=token, org=org)
+def list_buckets(client: InfluxDBClient):
     buckets_api = client.buckets_api()
     buckets = buckets_api.find_buckets()
 
@@ -14,8 +13,6 @@ def list_buckets(url: str, token: str, org: str):
         retention = b.retention_rules[0].every_seconds if b.retention_rules else "infinite"
         print(f"{b.name:<30} {b.id:<40} {retention}")
 
-    client.close()
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="List all InfluxDB v2 buckets.")
     parser.add_argument("--url", required=True, help="InfluxDB server URL (e.g., http://localhost:8086)")
@@ -23,5 +20,9 @@ if __name__ == "__main__":
     parser.add_argument("--org", required=True, help="Organization name")
 
     args = parser.parse_args()
-    list_buckets(url=args.url, token=args.token, org=args.org)
+    client = InfluxDBClient(url=args.url, token=args.token, org=args.org)
+    try:
+        list_buckets(client)
+    finally:
+        client.close()
 
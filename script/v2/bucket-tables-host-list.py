@@ -1,224 +1,196 @@
 #!/bin/env python3
 from influxdb_client import InfluxDBClient
-from influxdb_client.client.exceptions import InfluxDBError
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import json
-from datetime import datetime
+import logging
+import sys
+from datetime import datetime, timezone
 import os
 import csv
-import pytz  # Added for local time conversion
-
-def list_buckets_and_measurements(url: str, token: str, org: str):
-    try:
-        client = InfluxDBClient(url=url, token=token, org=org)
-        buckets_api = client.buckets_api()
-
-        buckets = buckets_api.find_buckets()
-        print(f"{'Bucket Name':<30} {'Bucket ID':<40} {'Retention':<15}")
-        print("-" * 85)
-        for b in buckets.buckets:
-            retention = b.retention_rules[0].every_seconds if b.retention_rules else "infinite"
-            print(f"{b.name:<30} {b.id:<40} {retention:<15}")
-
-            query = f'SHOW MEASUREMENTS'
-            try:
-                response = requests.post(
-                    f"{url}/query?org={org}&db={b.name}",
-                    headers={"Authorization": f"Token {token}"},
-                    params={"q": query}
-                )
-                response.raise_for_status()
-                data = response.json()
+import json
+import sqlite3
+import time
+from _shared import create_session, dump_json, get_tag_values, list_buckets_and_measurements, positive_int, post_query, query_measurement_names, quote_ident, setup_logging
 
-                print(f"  Debug: Raw response for SHOW MEASUREMENTS on bucket {b.name}: {json.dumps(data, indent=2)}")
+logger = logging.getLogger(__name__)
 
-                measurements = []
-                if "results" in data and data["results"] and "series" in data["results"][0] and "values" in data["results"][0]["series"][0]:
-                    measurements = [m[0] for m in data["results"][0]["series"][0]["values"]]
-                print(f"  Measurements (Tables): {', '.join(measurements) if measurements else 'None'}")
-                if not measurements:
-                    print(f"  Warning: No measurements found for bucket {b.name}. Check DBRP mapping, token permissions, or data presence.")
+# Resolved once per run
+UTC = timezone.utc
+LOCAL_TZ = datetime.now().astimezone().tzinfo
 
-            except requests.exceptions.HTTPError as e:
-                print(f"  Error querying measurements for bucket {b.name}: HTTP {e.response.status_code} - {e.response.text}")
-            except requests.exceptions.RequestException as e:
-                print(f"  Error querying measurements for bucket {b.name}: {e}")
-            except Exception as e:
-                print(f"  Unexpected error querying measurements for bucket {b.name}: {e}")
-            print()
+# Table headers, built once per run
+SEPARATOR_LINE = "=" * 80
+HEADER_LINE = f"  {'Host':<30} {'Time (UTC)':<30} {'Time (Local)':<30}\n  " + "-" * 90
+HOST_LIST_RULE = "  " + "-" * 60
+CSV_HEADER = ("Host", "LastTime_UTC", "LastTime_Local")
 
-    except InfluxDBError as e:
-        print(f"Error accessing InfluxDB: {e}")
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-    finally:
-        client.close()
+# Host tag values and latest record times of earlier runs, kept next to the CSV files
+CACHE_FILE = ".cache.sqlite"
+CACHE_VERSION = 2
 
-def query_measurement(url: str, token: str, org: str, bucket: str, measurement: str = None, latest_time: bool = False, all_measurement: bool = False, output_dir: str = "output"):
+def query_measurement(session: requests.Session, executor: ThreadPoolExecutor, url: str, org: str, bucket: str, measurement: str = None, latest_time: bool = False, all_measurement: bool = False, output_dir: str = "output", cache: sqlite3.Connection = None, cache_ttl: int = 3600):
     try:
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
         # Dictionary to track all host times across measurements
-        host_times = {}  # {host: [(utc_time_str, utc_formatted, local_formatted), ...]}
-
-        # Get local timezone from system
-        local_tz = datetime.now().astimezone().tzinfo
+        host_times = {}  # {host: (oldest, newest)}, each a (utc_time, utc_formatted, local_formatted) tuple
 
         # Get measurements to query
         if measurement:
             measurements = [measurement]
             print(f"\nQuerying {'latest record time' if latest_time else 'host tag values'} for measurement '{measurement}' in bucket '{bucket}'.")
         else:
-            measurements = get_measurements(url, token, org, bucket)
+            measurements = get_measurements(session, url, org, bucket)
             if not measurements:
-                print(f"\nNo measurements found in bucket '{bucket}'. Check DBRP mapping or data presence.")
+                print(f"\nNo measurements found in bucket '{bucket}'. Check token permissions or data presence.")
                 return
             print(f"\nQuerying {'latest record time' if latest_time else 'host tag values'} for all measurements in bucket '{bucket}' ({len(measurements)} measurements found).")
 
-        processed_count = 0
+        # One query per measurement, run concurrently and consumed in order; fresh cache entries are not queried
+        tag_key = "host"
+        fetched_at = int(time.time())
+        pending = []  # [((cached result, fetch time) or None, future or None)] in measurement order
         for meas in measurements:
+            cached = None
+            if cache is not None:
+                cache_get = cache_get_latest_times if latest_time else cache_get_tag_values
+                cached = cache_get(cache, url, org, bucket, meas, fetched_at - cache_ttl)
+            if cached is not None:
+                pending.append((cached, None))
+            elif latest_time:
+                # The GROUP BY series name every host, so no tag value query is needed
+                pending.append((None, executor.submit(post_query, session, url, org, bucket,
+                                                      f'SELECT * FROM {quote_ident(meas)} GROUP BY {quote_ident(tag_key)} ORDER BY time DESC LIMIT 1')))
+            else:
+                pending.append((None, executor.submit(get_tag_values, session, url, org, bucket, meas, tag_key)))
+
+        processed_count = 0
+        for meas, (cached, future) in zip(measurements, pending):
             processed_count += 1
             print(f"\nMeasurement: {meas} ({processed_count}/{len(measurements)})")
-            print("=" * 80)
-
-            # Initialize CSV data for this measurement
-            csv_data = []
+            print(SEPARATOR_LINE)
 
-            # Step 1: Get all host tag values for the measurement
-            tag_key = "host"
-            query = f'SHOW TAG VALUES ON "{bucket}" FROM "{meas}" WITH KEY = "{tag_key}"'
-            print(f"  Fetching all '{tag_key}' tag values for measurement '{meas}'.")
+            # Step 1: Get all host tag values (or, in latest-time mode, the latest time of every host) for the measurement
+            if latest_time:
+                print(f"  Fetching latest record time of every '{tag_key}' for measurement '{meas}'.")
+            else:
+                print(f"  Fetching all '{tag_key}' tag values for measurement '{meas}'.")
 
             try:
-                response = requests.post(
-                    f"{url}/query?org={org}&db={bucket}",
-                    headers={"Authorization": f"Token {token}"},
-                    params={"q": query}
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                print(f"    Debug: Raw response for SHOW TAG VALUES: {json.dumps(data, indent=2)}")
+                if cached is not None:
+                    # Cached latest times may be up to --cache-ttl old, so say where they came from
+                    cached, cached_at = cached
+                    print(f"  Using cached result from {CACHE_FILE}, fetched at {datetime.fromtimestamp(cached_at):%Y-%m-%d %H:%M:%S} "
+                          f"(run with --no-cache for live data).")
 
-                host_values = []
-                if "results" in data and data["results"] and "series" in data["results"][0]:
-                    for series in data["results"][0]["series"]:
-                        if "values" in series:
-                            host_values.extend(v[1] for v in series["values"])
-                    host_values = list(set(host_values))  # Remove duplicates
+                if latest_time:
+                    if cached is not None:
+                        latest_times = cached
+                    else:
+                        data = future.result()
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"    Debug: Raw response for SELECT * GROUP BY {tag_key}: {dump_json(data)}")
+
+                        # Time is the first column
+                        latest_times = {}
+                        if "results" in data and data["results"] and "series" in data["results"][0]:
+                            for series in data["results"][0]["series"]:
+                                host = series.get("tags", {}).get(tag_key)
+                                if host and series.get("values"):
+                                    latest_times[host] = series["values"][0][0]
+                        if cache is not None:
+                            cache_put_latest_times(cache, url, org, bucket, meas, latest_times, fetched_at)
+                    host_values = latest_times.keys()
+                    if not host_values:
+                        print(f"  No data with a '{tag_key}' tag found for measurement '{meas}' in bucket '{bucket}'.")
+                        continue
                 else:
-                    print(f"  No '{tag_key}' tag values found for measurement '{meas}' in bucket '{bucket}'.")
-                    continue
+                    if cached is not None:
+                        host_values = cached
+                    else:
+                        host_values = future.result()
+                        if cache is not None:
+                            cache_put_tag_values(cache, url, org, bucket, meas, host_values, fetched_at)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"    Debug: Tag values returned by schema.measurementTagValues: {dump_json(sorted(host_values))}")
 
-                if not host_values:
-                    print(f"  No '{tag_key}' tag values found for measurement '{meas}'.")
-                    continue
+                    if not host_values:
+                        print(f"  No '{tag_key}' tag values found for measurement '{meas}' in bucket '{bucket}'.")
+                        continue
 
                 # Step 2: Process based on mode
                 if latest_time:
-                    # Query latest record for each host
+                    # Latest record for each host, from the GROUP BY query above
                     print(f"  Latest record time for each host in measurement '{meas}' (bucket: {bucket}):")
-                    print(f"  {'Host':<30} {'Time (UTC)':<30} {'Time (Local)':<30}")
-                    print("  " + "-" * 90)
-
-                    for host in sorted(host_values):
-                        query = f'SELECT * FROM "{meas}" WHERE host=\'{host}\' LIMIT 1'
-                        try:
-                            response = requests.post(
-                                f"{url}/query?org={org}&db={bucket}",
-                                headers={"Authorization": f"Token {token}"},
-                                params={"q": query}
-                            )
-                            response.raise_for_status()
-                            data = response.json()
-
-                            print(f"    Debug: Raw response for SELECT * WHERE host='{host}': {json.dumps(data, indent=2)}")
-
-                            if "results" not in data or not data["results"] or "series" not in data["results"][0]:
-                                print(f"  No data found for host '{host}' in measurement '{meas}'.")
-                                continue
-
-                            series = data["results"][0]["series"][0]
-                            utc_time_str = series["values"][0][0]  # Time is the first column
-
-                            # Parse UTC time
-                            try:
-                                utc_time = datetime.strptime(utc_time_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-                                utc_time = pytz.utc.localize(utc_time)
-                            except ValueError:
+                    print(HEADER_LINE)
+
+                    # Write CSV file for this measurement
+                    csv_file = os.path.join(output_dir, f"{bucket}_{meas}.csv")
+                    rows_written = 0
+                    lines = []
+                    try:
+                        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+                            writer = csv.writer(f)
+                            writer.writerow(CSV_HEADER)
+
+                            for host in sorted(host_values):
+                                utc_time_str = latest_times[host]
+
                                 try:
-                                    utc_time = datetime.strptime(utc_time_str, "%Y-%m-%dT%H:%M:%SZ")
-                                    utc_time = pytz.utc.localize(utc_time)
-                                except ValueError:
-                                    print(f"  Invalid time format for host '{host}': {utc_time_str}")
+                                    # Parse UTC time, truncating nanoseconds to microseconds
+                                    base_time, _, fraction = utc_time_str.rstrip('Z').partition('.')
+                                    try:
+                                        utc_time = datetime.fromisoformat(f"{base_time}.{fraction[:6].ljust(6, '0')}" if fraction else base_time)
+                                    except ValueError:
+                                        lines.append(f"  Invalid time format for host '{host}': {utc_time_str}\n")
+                                        continue
+
+                                    # Convert to local time
+                                    local_time = utc_time.replace(tzinfo=UTC).astimezone(LOCAL_TZ)
+
+                                    # Format times
+                                    formatted_utc_time = utc_time.isoformat(sep=' ', timespec='microseconds')
+                                    formatted_local_time = local_time.replace(tzinfo=None).isoformat(sep=' ', timespec='microseconds')
+
+                                except Exception as e:
+                                    lines.append(f"  Unexpected error formatting time for host '{host}' in measurement '{meas}': {e}\n")
                                     continue
 
-                            # Convert to local time
-                            local_time = utc_time.astimezone(local_tz)
-
-                            # Format times
-                            formatted_utc_time = utc_time.strftime("%Y-%m-%d %H:%M:%S.%f")
-                            formatted_local_time = local_time.strftime("%Y-%m-%d %H:%M:%S.%f")
-
-                            # Store times for OldTime/NewTime calculation
-                            if host not in host_times:
-                                host_times[host] = []
-                            host_times[host].append((utc_time_str, formatted_utc_time, formatted_local_time))
-
-                            print(f"  {host:<30} {formatted_utc_time:<30} {formatted_local_time:<30}")
-                            csv_data.append({
-                                "Host": host,
-                                "LastTime_UTC": formatted_utc_time,
-                                "LastTime_Local": formatted_local_time
-                            })
-
-                        except requests.exceptions.HTTPError as e:
-                            print(f"  Error querying host '{host}' in measurement '{meas}': HTTP {e.response.status_code} - {e.response.text}")
-                            continue
-                        except requests.exceptions.RequestException as e:
-                            print(f"  Error querying host '{host}' in measurement '{meas}': {e}")
-                            continue
-                        except Exception as e:
-                            print(f"  Unexpected error querying host '{host}' in measurement '{meas}': {e}")
-                            continue
+                                # Track oldest/newest time for OldTime/NewTime
+                                entry = (utc_time, formatted_utc_time, formatted_local_time)
+                                prev = host_times.get(host)
+                                host_times[host] = (min(prev[0], entry), max(prev[1], entry)) if prev else (entry, entry)
 
-                    # Write CSV file for this measurement
-                    if csv_data:
-                        csv_file = os.path.join(output_dir, f"{bucket}_{meas}.csv")
-                        try:
-                            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                                writer = csv.DictWriter(f, fieldnames=["Host", "LastTime_UTC", "LastTime_Local"])
-                                writer.writeheader()
-                                writer.writerows(csv_data)
-                            print(f"  Saved results to {csv_file}")
-                        except IOError as e:
-                            print(f"  Error writing CSV file '{csv_file}': {e}")
+                                lines.append(f"  {host:<30} {formatted_utc_time:<30} {formatted_local_time:<30}\n")
+                                writer.writerow((host, formatted_utc_time, formatted_local_time))
+                                rows_written += 1
+                    except IOError as e:
+                        lines.append(f"  Error writing CSV file '{csv_file}': {e}\n")
                     else:
-                        print(f"  No data to save for measurement '{meas}'.")
+                        if rows_written:
+                            lines.append(f"  Saved results to {csv_file}\n")
+                        else:
+                            os.remove(csv_file)
+                            lines.append(f"  No data to save for measurement '{meas}'.\n")
+                    sys.stdout.write("".join(lines))
 
                 else:
-                    # Display host tag values
+                    # Display host tag values and write them to the CSV file (only Host column)
                     print(f"  List of '{tag_key}' tag values in measurement '{meas}' (bucket: {bucket}):")
-                    print("  " + "-" * 60)
-                    for host in sorted(host_values):
-                        print(f"  {host}")
-                        csv_data.append({"Host": host, "LastTime_UTC": "", "LastTime_Local": ""})
-
-                    # Write CSV file for this measurement
-                    if csv_data:
-                        csv_file = os.path.join(output_dir, f"{bucket}_{meas}.csv")
-                        try:
-                            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                                writer = csv.DictWriter(f, fieldnames=["Host", "LastTime_UTC", "LastTime_Local"])
-                                writer.writeheader()
-                                writer.writerows(csv_data)
-                            print(f"  Saved results to {csv_file}")
-                        except IOError as e:
-                            print(f"  Error writing CSV file '{csv_file}': {e}")
-                    else:
-                        print(f"  No data to save for measurement '{meas}'.")
+                    print(HOST_LIST_RULE)
+                    csv_file = os.path.join(output_dir, f"{bucket}_{meas}.csv")
+                    try:
+                        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+                            writer = csv.writer(f)
+                            writer.writerow(CSV_HEADER)
+                            hosts = sorted(host_values)
+                            writer.writerows((host, "", "") for host in hosts)
+                        sys.stdout.write("".join(f"  {host}\n" for host in hosts))
+                        print(f"  Saved results to {csv_file}")
+                    except IOError as e:
+                        print(f"  Error writing CSV file '{csv_file}': {e}")
 
             except requests.exceptions.HTTPError as e:
                 print(f"  Error querying '{tag_key}' tag values for measurement '{meas}' in bucket '{bucket}': HTTP {e.response.status_code} - {e.response.text}")
@@ -240,12 +212,7 @@ def query_measurement(url: str, token: str, org: str, bucket: str, measurement:
                     writer.writeheader()
 
                     for host in sorted(host_times.keys()):
-                        times = host_times[host]
-                        if not times:
-                            continue
-
-                        oldest_time = min(times, key=lambda x: x[0])  # Compare by raw UTC string
-                        newest_time = max(times, key=lambda x: x[0])
+                        oldest_time, newest_time = host_times[host]
 
                         writer.writerow({
                             "Host": host,
@@ -266,22 +233,52 @@ def query_measurement(url: str, token: str, org: str, bucket: str, measurement:
     except Exception as e:
         print(f"Unexpected error processing bucket '{bucket}': {e}")
 
-def get_measurements(url: str, token: str, org: str, bucket: str):
-    """Helper function to get all measurements in a bucket using InfluxQL."""
+def open_cache(output_dir: str):
+    """Helper function to open the on-disk result cache in the output directory, creating its tables on first use."""
+    cache = sqlite3.connect(os.path.join(output_dir, CACHE_FILE))
+    if cache.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+        # Tables written by an older layout are dropped rather than migrated; they only hold cached query results
+        cache.executescript(f"DROP TABLE IF EXISTS tags; DROP TABLE IF EXISTS latest; PRAGMA user_version = {CACHE_VERSION};")
+    cache.executescript("""
+        CREATE TABLE IF NOT EXISTS tags (url TEXT, org TEXT, bucket TEXT, meas TEXT, hosts TEXT, fetched_at INTEGER,
+                                         PRIMARY KEY (url, org, bucket, meas));
+        CREATE TABLE IF NOT EXISTS latest (url TEXT, org TEXT, bucket TEXT, meas TEXT, host TEXT, ts TEXT, fetched_at INTEGER,
+                                           PRIMARY KEY (url, org, bucket, meas, host));
+    """)
+    return cache
+
+def cache_get_tag_values(cache: sqlite3.Connection, url: str, org: str, bucket: str, meas: str, fresh_after: int):
+    """Helper function to get the cached (host tag values, fetch time) of a measurement, or None when there is no fresh entry."""
+    row = cache.execute("SELECT hosts, fetched_at FROM tags WHERE url = ? AND org = ? AND bucket = ? AND meas = ? AND fetched_at > ?",
+                        (url, org, bucket, meas, fresh_after)).fetchone()
+    return (set(json.loads(row[0])), row[1]) if row else None
+
+def cache_put_tag_values(cache: sqlite3.Connection, url: str, org: str, bucket: str, meas: str, hosts: set, fetched_at: int):
+    """Helper function to store the host tag values of a measurement in the cache."""
+    with cache:
+        cache.execute("INSERT OR REPLACE INTO tags VALUES (?, ?, ?, ?, ?, ?)",
+                      (url, org, bucket, meas, json.dumps(sorted(hosts)), fetched_at))
+
+def cache_get_latest_times(cache: sqlite3.Connection, url: str, org: str, bucket: str, meas: str, fresh_after: int):
+    """Helper function to get the cached ({host: latest time}, fetch time) of a measurement, or None when there is no fresh entry."""
+    rows = cache.execute("SELECT host, ts, fetched_at FROM latest WHERE url = ? AND org = ? AND bucket = ? AND meas = ? AND fetched_at > ?",
+                         (url, org, bucket, meas, fresh_after)).fetchall()
+    return ({host: ts for host, ts, _ in rows}, rows[0][2]) if rows else None
+
+def cache_put_latest_times(cache: sqlite3.Connection, url: str, org: str, bucket: str, meas: str, latest_times: dict, fetched_at: int):
+    """Helper function to replace the cached latest times of a measurement."""
+    with cache:
+        # Hosts that no longer report must not linger from an older run
+        cache.execute("DELETE FROM latest WHERE url = ? AND org = ? AND bucket = ? AND meas = ?", (url, org, bucket, meas))
+        cache.executemany("INSERT INTO latest VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          ((url, org, bucket, meas, host, ts, fetched_at) for host, ts in latest_times.items()))
+
+def get_measurements(session: requests.Session, url: str, org: str, bucket: str):
+    """Helper function to get all measurements in a bucket using Flux."""
     try:
-        query = f'SHOW MEASUREMENTS'
-        response = requests.post(
-            f"{url}/query?org={org}&db={bucket}",
-            headers={"Authorization": f"Token {token}"},
-            params={"q": query}
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        measurements = []
-        if "results" in data and data["results"] and "series" in data["results"][0] and "values" in data["results"][0]["series"][0]:
-            measurements = [m[0] for m in data["results"][0]["series"][0]["values"]]
-        print(f"  Debug: Found measurements in bucket {bucket}: {', '.join(measurements) if measurements else 'None'}")
+        measurements = query_measurement_names(session, url, org, bucket)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"  Debug: Found measurements in bucket {bucket}: {', '.join(measurements) if measurements else 'None'}")
         return measurements
     except requests.exceptions.HTTPError as e:
         print(f"Error querying measurements for bucket {bucket}: HTTP {e.response.status_code} - {e.response.text}")
@@ -303,26 +300,53 @@ if __name__ == "__main__":
     parser.add_argument("--all-measurement", action="store_true", help="Query host tag values or latest time for all measurements in the bucket")
     parser.add_argument("--latest-time", action="store_true", help="Query the latest record time for each host in the measurement(s)")
     parser.add_argument("--output-dir", default="output", help="Directory to save CSV and summary output files (default: output)")
+    parser.add_argument("--cache-ttl", type=int, default=3600, help="Seconds a cached host list or latest time stays valid (default: 3600)")
+    parser.add_argument("--no-cache", action="store_true", help="Always query InfluxDB and do not read or update the result cache")
+    parser.add_argument("--workers", type=positive_int, default=16, help="Number of concurrent queries sent to InfluxDB (default: 16)")
+    parser.add_argument("--debug", action="store_true", help="Print raw InfluxDB responses for debugging")
 
     args = parser.parse_args()
 
-    # List buckets and measurements
-    list_buckets_and_measurements(url=args.url, token=args.token, org=args.org)
-
-    # Query host tag values or latest time
-    if args.bucket:
-        if args.latest_time or args.all_measurement or args.measurement:
-            query_measurement(
-                url=args.url,
-                token=args.token,
-                org=args.org,
-                bucket=args.bucket,
-                measurement=args.measurement,
-                latest_time=args.latest_time,
-                all_measurement=args.all_measurement,
-                output_dir=args.output_dir
-            )
+    setup_logging(logger, args.debug)
+
+    client = InfluxDBClient(url=args.url, token=args.token, org=args.org, enable_gzip=True)
+    session = create_session(args.token, pool_size=args.workers)
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    cache = None
+    try:
+        # List buckets and measurements
+        list_buckets_and_measurements(client, session, executor, url=args.url, org=args.org)
+
+        # Query host tag values or latest time
+        if args.bucket:
+            if args.latest_time or args.all_measurement or args.measurement:
+                if not args.no_cache:
+                    # Reuse fresh results of earlier runs
+                    try:
+                        os.makedirs(args.output_dir, exist_ok=True)
+                        cache = open_cache(args.output_dir)
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"Warning: Result cache disabled, cannot open it in '{args.output_dir}': {e}")
+                query_measurement(
+                    session,
+                    executor,
+                    url=args.url,
+                    org=args.org,
+                    bucket=args.bucket,
+                    measurement=args.measurement,
+                    latest_time=args.latest_time,
+                    all_measurement=args.all_measurement,
+                    output_dir=args.output_dir,
+                    cache=cache,
+                    cache_ttl=args.cache_ttl
+                )
+            else:
+                print("Error: Please specify --measurement, --all-measurement, or --latest-time when providing --bucket.")
         else:
-            print("Error: Please specify --measurement, --all-measurement, or --latest-time when providing --bucket.")
-    else:
-        print("Error: --bucket is required when using --measurement, --all-measurement, or --latest-time.")
+            print("Error: --bucket is required when using --measurement, --all-measurement, or --latest-time.")
+    finally:
+        if cache is not None:
+            cache.close()
+        executor.shutdown()
+        session.close()
+        client.close()
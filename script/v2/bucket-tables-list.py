@@ -2,50 +2,175 @@
 
 from influxdb_client import InfluxDBClient
 from influxdb_client.client.exceptions import InfluxDBError
+from influxdb_client.client.query_api import QueryApi
+from influxdb_client.client.bucket_api import BucketsApi
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import fnmatch
+import json
+import os
+import sys
+import time
+from _shared import flux_error_message, positive_int, quote_flux_string
 
-def list_buckets_and_measurements(url: str, token: str, org: str):
+# Buckets listed per union query, and how many of those queries run at once
+BATCH_SIZE = 8
+MAX_WORKERS = 5
+
+# find_buckets returns 20 buckets unless told otherwise; 100 is the API maximum per page
+BUCKETS_PAGE_SIZE = 100
+
+# Measurements are read from the storage index over a bounded recent window rather than the whole bucket history
+MEASUREMENTS_START = "-30d"
+
+# Measurements of earlier runs: {"<url> <bucket id>": {"updated_at", "fetched_at", "max_measurements", "measurements"}}
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "pontus", "measurements.json")
+
+def list_buckets_and_measurements(client: InfluxDBClient, executor: ThreadPoolExecutor, bucket_names: list = None, pattern: str = None, max_measurements: int = 1000, cache: dict = None, cache_ttl: int = 3600):
     try:
-        client = InfluxDBClient(url=url, token=token, org=org)
         buckets_api = client.buckets_api()
         query_api = client.query_api()
-        buckets = buckets_api.find_buckets()
+        buckets = find_all_buckets(buckets_api, executor)
+        # Buckets filtered out are neither queried nor listed
+        if bucket_names or pattern:
+            buckets = [b for b in buckets
+                       if (not bucket_names or b.name in bucket_names) and (not pattern or fnmatch.fnmatchcase(b.name, pattern))]
+            if not buckets:
+                print("No buckets match the --bucket/--pattern filters.")
+                return
+
+        # Buckets listed by a recent run, and not modified since, are answered from the cache without a query
+        fetched_at = int(time.time())
+        cached = {}
+        if cache is not None:
+            for b in buckets:
+                entry = cache.get(f"{client.url} {b.id}")
+                if (entry and entry["updated_at"] == str(b.updated_at) and entry["fetched_at"] > fetched_at - cache_ttl
+                        and entry.get("max_measurements") == max_measurements):
+                    cached[b.name] = entry["measurements"]
+        uncached = [b for b in buckets if b.name not in cached]
 
         print(f"{'Bucket Name':<30} {'Bucket ID':<40} {'Retention':<15}")
         print("-" * 85)
-        for b in buckets.buckets:
+        # Query measurements (tables) with one union query per batch of buckets, run concurrently
+        batches = [uncached[i:i + BATCH_SIZE] for i in range(0, len(uncached), BATCH_SIZE)]
+        futures = {}  # {bucket name: future of its batch}
+        for batch in batches:
+            future = executor.submit(query_measurements, query_api, batch, max_measurements)
+            futures.update((b.name, future) for b in batch)
+
+        for b in buckets:
             retention = b.retention_rules[0].every_seconds if b.retention_rules else "infinite"
-            print(f"{b.name:<30} {b.id:<40} {retention:<15}")
+            lines = [f"{b.name:<30} {b.id:<40} {retention:<15}\n"]
 
-            # Query measurements (tables) in the bucket
-            query = f'''
-                import "influxdata/influxdb/schema"
-                schema.measurements(bucket: "{b.name}")
-            '''
             try:
-                tables = query_api.query(query=query)
-                measurements = [record["_value"] for table in tables for record in table.records]
+                if b.name in cached:
+                    measurements = cached[b.name]
+                else:
+                    measurements = futures[b.name].result()[b.name]
+                    if cache is not None:
+                        cache[f"{client.url} {b.id}"] = {"updated_at": str(b.updated_at), "fetched_at": fetched_at,
+                                                         "max_measurements": max_measurements, "measurements": measurements}
                 if measurements:
-                    print(f"  Measurements (Tables): {', '.join(measurements)}")
+                    # One name beyond the limit is fetched to tell a truncated list from one that is exactly full
+                    truncated = ", ... (truncated)" if len(measurements) > max_measurements else ""
+                    lines.append(f"  Measurements (Tables): {', '.join(measurements[:max_measurements])}{truncated}\n")
                 else:
-                    print("  Measurements (Tables): None")
+                    lines.append("  Measurements (Tables): None\n")
             except InfluxDBError as e:
-                print(f"  Error querying measurements for bucket {b.name}: {e}")
-            print()  # Empty line for readability
+                lines.append(f"  Error querying measurements for bucket {b.name}: {e}\n")
+            lines.append("\n")  # Empty line for readability
+            sys.stdout.write("".join(lines))
 
     except InfluxDBError as e:
         print(f"Error accessing InfluxDB: {e}")
     except Exception as e:
         print(f"Unexpected error: {e}")
-    finally:
-        client.close()
+
+def load_cache(path: str):
+    """Helper function to load the measurement cache file, starting empty when it is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(path: str, cache: dict):
+    """Helper function to write the measurement cache file."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Replace the file in one step so a concurrent run never reads a half-written cache
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        print(f"Warning: Could not write measurement cache '{path}': {e}")
+
+def find_all_buckets(buckets_api: BucketsApi, executor: ThreadPoolExecutor):
+    """Helper function to get every bucket of the organization, fetching the pages after the first concurrently."""
+    page = buckets_api.find_buckets(limit=BUCKETS_PAGE_SIZE).buckets
+    buckets = list(page)
+    while len(page) == BUCKETS_PAGE_SIZE:
+        # The API reports no total, so the next pages are requested a pool's worth at a time until one comes back short
+        offsets = range(len(buckets), len(buckets) + MAX_WORKERS * BUCKETS_PAGE_SIZE, BUCKETS_PAGE_SIZE)
+        for page in executor.map(lambda offset: buckets_api.find_buckets(offset=offset, limit=BUCKETS_PAGE_SIZE).buckets, offsets):
+            buckets.extend(page)
+            if len(page) < BUCKETS_PAGE_SIZE:
+                break
+    return buckets
+
+def query_measurements(query_api: QueryApi, buckets: list, max_measurements: int):
+    """Helper function to list up to max_measurements + 1 measurements of each bucket in a batch with one Flux query, grouped by bucket name."""
+    measurements_by_bucket = {b.name: [] for b in buckets}
+    # Plain CSV rows; no FluxTable/FluxRecord objects are needed for two columns
+    rows = query_api.query_csv(query=build_measurements_query(buckets, max_measurements + 1))
+    bucket_index = value_index = None
+    for row in rows:
+        if row[0].startswith("#"):
+            # Annotation rows precede every table and its header row
+            bucket_index = None
+        elif bucket_index is None:
+            if "_value" not in row:
+                raise InfluxDBError(message=f"Flux query failed: {flux_error_message(row, rows)}")
+            bucket_index, value_index = row.index("_bucket"), row.index("_value")
+        else:
+            measurements_by_bucket[row[bucket_index]].append(row[value_index])
+    return measurements_by_bucket
+
+def build_measurements_query(buckets: list, limit: int):
+    """Helper function to build one Flux query that lists up to limit measurements of every bucket, each record tagged with its bucket name."""
+    streams = [f'schema.measurements(bucket: {quote_flux_string(b.name)}, start: {MEASUREMENTS_START}) |> limit(n: {limit}) '
+               f'|> map(fn: (r) => ({{r with _bucket: {quote_flux_string(b.name)}}}))' for b in buckets]
+    if len(streams) == 1:
+        # union() rejects fewer than two streams, so a single bucket is queried on its own
+        return f'import "influxdata/influxdb/schema"\n{streams[0]}'
+    return ('import "influxdata/influxdb/schema"\n' + "\n".join(f"b{i} = {stream}" for i, stream in enumerate(streams)) +
+            f'\nunion(tables: [{", ".join(f"b{i}" for i in range(len(streams)))}])')
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="List all InfluxDB v2 buckets and their measurements.")
     parser.add_argument("--url", required=True, help="InfluxDB server URL (e.g., http://localhost:8086)")
     parser.add_argument("--token", required=True, help="InfluxDB access token")
     parser.add_argument("--org", required=True, help="Organization name")
+    parser.add_argument("--bucket", action="append", help="Only list this bucket (repeatable)")
+    parser.add_argument("--pattern", help="Only list buckets whose name matches this glob pattern (e.g., 'prod-*')")
+    parser.add_argument("--max-measurements", type=positive_int, default=1000, help="Maximum number of measurements listed per bucket (default: 1000)")
+    parser.add_argument("--cache-ttl", type=int, default=3600, help="Seconds a cached measurement list stays valid (default: 3600)")
+    parser.add_argument("--no-cache", action="store_true", help="Always query InfluxDB and do not read or update the measurement cache")
 
     args = parser.parse_args()
-    list_buckets_and_measurements(url=args.url, token=args.token, org=args.org)
+
+    # Connection pool sized for the concurrent batch queries
+    client = InfluxDBClient(url=args.url, token=args.token, org=args.org, enable_gzip=True,
+                            timeout=30_000, connection_pool_maxsize=MAX_WORKERS)
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    cache = None if args.no_cache else load_cache(CACHE_FILE)
+    try:
+        list_buckets_and_measurements(client, executor, bucket_names=args.bucket, pattern=args.pattern,
+                                      max_measurements=args.max_measurements, cache=cache, cache_ttl=args.cache_ttl)
+        if cache is not None:
+            save_cache(CACHE_FILE, cache)
+    finally:
+        executor.shutdown()
+        client.close()
 